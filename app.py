@@ -2,21 +2,13 @@ app.py
 import streamlit as st
 import os
 import re
-import json
 from pathlib import Path
 from datetime import datetime
-import base64
-from io import BytesIO
+import hashlib
 
-from youtube_transcript_api import YouTubeTranscriptApi
-import openai
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-from collections import Counter
-import matplotlib.pyplot as plt
-from wordcloud import WordCloud
-import numpy as np
+import httpx
+from openai import OpenAI
+from diskcache import Cache
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -79,158 +71,85 @@ st.markdown("""
 STORAGE_PATH = Path('./data')
 STORAGE_PATH.mkdir(parents=True, exist_ok=True)
 
+# Persistent cache for OpenAI results (shared across reruns and sessions)
+CACHE_TTL = int(os.environ.get('CACHE_TTL', 7 * 24 * 3600))
+cache = Cache(str(STORAGE_PATH / 'cache'))
+
+def cache_key(*parts) -> str:
+    """Build a stable disk-cache key from the given parts"""
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
 # API Configuration
-YOUTUBE_API_KEY = os.environ.get('YOUTUBE_API_KEY', '')
 OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', '')
+# FastAPI backend (backend/orchestrator.py) that does transcript + AI analysis
+BACKEND_URL = os.environ.get('BACKEND_URL', 'http://localhost:8000').rstrip('/')
+# Must outlast the backend's worst case for one analysis: up to 5 OpenAI attempts of
+# OPENAI_READ_TIMEOUT (120s) each plus up to 4 x 30s backoff, then transcript and metadata
+BACKEND_TIMEOUT = float(os.environ.get('BACKEND_TIMEOUT', 900))
 
 # Configure OpenAI
 if OPENAI_API_KEY:
-    openai.api_key = OPENAI_API_KEY
+    openai_client = OpenAI(api_key=OPENAI_API_KEY)
     MODEL_NAME = "gpt-3.5-turbo"  # You can also use "gpt-4" if you have access
     model_available = True
 else:
     model_available = False
     st.error("OpenAI API key not found. Please add OPENAI_API_KEY to your .env file")
 
-# Download NLTK data if needed
-@st.cache_resource
-def download_nltk_data():
-    try:
-        nltk.data.find('tokenizers/punkt')
-    except LookupError:
-        nltk.download('punkt', quiet=True)
-    try:
-        nltk.data.find('corpora/stopwords')
-    except LookupError:
-        nltk.download('stopwords', quiet=True)
-
-download_nltk_data()
-
 # Initialize session state
 if 'analyzed_videos' not in st.session_state:
     st.session_state.analyzed_videos = {}
 if 'insights' not in st.session_state:
     st.session_state.insights = []
 
-def call_openai(prompt: str, temperature: float = 0.7, max_tokens: int = 1000) -> str:
-    """Call OpenAI API with the given prompt"""
+def build_messages(prompt: str) -> list:
+    """Chat messages for an OpenAI request"""
+    return [
+        {"role": "system", "content": "You are a helpful assistant that analyzes YouTube videos."},
+        {"role": "user", "content": prompt}
+    ]
+
+def call_openai_stream(prompt: str, temperature: float = 0.7, max_tokens: int = 1000):
+    """Yield the OpenAI reply chunk by chunk (for st.write_stream); full replies are cached"""
     if not model_available:
-        return None
+        return
+    
+    key = cache_key('openai', MODEL_NAME, prompt, temperature, max_tokens)
+    cached = cache.get(key)
+    if cached is not None:
+        yield cached
+        return
     
+    parts = []
     try:
-        response = openai.ChatCompletion.create(
+        for chunk in openai_client.chat.completions.create(
             model=MODEL_NAME,
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that analyzes YouTube videos."},
-                {"role": "user", "content": prompt}
-            ],
+            messages=build_messages(prompt),
             temperature=temperature,
-            max_tokens=max_tokens
-        )
-        return response.choices[0].message.content
+            max_tokens=max_tokens,
+            stream=True
+        ):
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                yield delta
     except Exception as e:
         st.error(f"OpenAI API Error: {str(e)}")
-        return None
+        return
+    reply = ''.join(parts)
+    if reply.strip():  # an empty reply would otherwise be served as a hit forever
+        cache.set(key, reply, expire=CACHE_TTL)
+
+# watch?v= / youtu.be / embed / v URL shapes, compiled once at import
+VIDEO_ID_RE = re.compile(r'(?:youtube\.com\/(?:watch\?v=|embed\/|v\/)|youtu\.be\/)([0-9A-Za-z_-]{11})')
 
 def extract_video_id(url: str) -> str:
     """Extract YouTube video ID from URL"""
-    patterns = [
-        r'(?:youtube\.com\/watch\?v=)([0-9A-Za-z_-]{11})',
-        r'(?:youtu\.be\/)([0-9A-Za-z_-]{11})',
-        r'(?:youtube\.com\/embed\/)([0-9A-Za-z_-]{11})',
-        r'(?:youtube\.com\/v\/)([0-9A-Za-z_-]{11})',
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
-    return None
-
-def get_video_info(video_id: str) -> dict:
-    """Get video information using YouTube Data API v3"""
-    if not YOUTUBE_API_KEY:
-        return {"title": f"Video {video_id}", "description": "No API key provided"}
-    
-    try:
-        from googleapiclient.discovery import build
-        from googleapiclient.errors import HttpError
-        
-        youtube = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
-        
-        request = youtube.videos().list(
-            part='snippet,statistics,contentDetails',
-            id=video_id
-        )
-        response = request.execute()
-        
-        if response.get('items'):
-            item = response['items'][0]
-            return {
-                'title': item['snippet'].get('title', 'Unknown Title'),
-                'channel': item['snippet'].get('channelTitle', 'Unknown Channel'),
-                'description': item['snippet'].get('description', '')[:500],
-                'published': item['snippet'].get('publishedAt', ''),
-                'views': int(item['statistics'].get('viewCount', 0)),
-                'likes': int(item['statistics'].get('likeCount', 0)),
-                'duration': item['contentDetails'].get('duration', ''),
-                'thumbnail': item['snippet'].get('thumbnails', {}).get('high', {}).get('url', '')
-            }
-        else:
-            return {"title": f"Video {video_id}", "description": "Video not found"}
-            
-    except HttpError as e:
-        st.warning(f"YouTube API error: {str(e)[:100]}")
-        return {"title": f"Video {video_id}", "description": "Could not fetch video info"}
-        
-    except Exception as e:
-        st.warning(f"Error fetching video info: {str(e)[:100]}")
-        return {"title": f"Video {video_id}", "description": "Could not fetch video info"}
-
-def extract_transcript(video_id: str) -> tuple:
-    """Extract transcript from YouTube video"""
-    video_info = get_video_info(video_id)
-    
-    try:
-        transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
-        
-        # Try to get English transcript first
-        for transcript in transcript_list:
-            if transcript.language_code.startswith('en'):
-                try:
-                    data = transcript.fetch()
-                    text = " ".join([entry['text'] for entry in data])
-                    st.success("✅ Extracted English transcript!")
-                    return text, video_info
-                except:
-                    continue
-        
-        # Try any available transcript
-        for transcript in transcript_list:
-            try:
-                if transcript.is_translatable:
-                    translated = transcript.translate('en')
-                    data = translated.fetch()
-                    text = " ".join([entry['text'] for entry in data])
-                    st.success(f"✅ Translated from {transcript.language} to English!")
-                    return text, video_info
-                else:
-                    data = transcript.fetch()
-                    text = " ".join([entry['text'] for entry in data])
-                    st.warning(f"⚠️ Using {transcript.language} transcript")
-                    return text, video_info
-            except:
-                continue
-                    
-        st.error("❌ Could not extract transcript from this video")
-        return None, video_info
-        
-    except Exception as e:
-        st.error(f"❌ Error: {str(e)[:200]}")
-        return None, video_info
+    match = VIDEO_ID_RE.search(url)
+    return match.group(1) if match else None
 
 def analyze_video_content(video_id: str, video_info: dict) -> dict:
-    """Analyze what the video is about using OpenAI"""
+    """Analyze what the video is about using OpenAI, streaming the answer into the page"""
     title = video_info.get('title', '')
     channel = video_info.get('channel', '')
     description = video_info.get('description', '')
@@ -253,7 +172,7 @@ Please provide:
 
 Format your response clearly with these headings."""
 
-    response = call_openai(prompt)
+    response = st.write_stream(call_openai_stream(prompt))
     
     if response:
         return {
@@ -263,146 +182,32 @@ Format your response clearly with these headings."""
         }
     return None
 
-def analyze_sentiment_with_openai(transcript: str) -> dict:
-    """Analyze sentiment using OpenAI"""
-    if not model_available:
-        return {"overall": "API key required", "score": 0.5, "explanation": "Please add OpenAI API key"}
-    
-    prompt = f"""Analyze the sentiment of this video transcript. 
-    Provide:
-    1. Overall sentiment (positive, negative, or neutral)
-    2. Sentiment score (0-1, where 0 is very negative and 1 is very positive)
-    3. A brief explanation of the sentiment
-    
-    Respond in JSON format like:
-    {{
-        "overall": "positive/negative/neutral",
-        "score": 0.75,
-        "explanation": "Brief explanation"
-    }}
-    
-    Transcript: {transcript[:3000]}..."""
-    
-    response = call_openai(prompt)
-    
-    if response:
-        try:
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
-        except:
-            pass
-    
-    return {
-        "overall": "neutral",
-        "score": 0.5,
-        "explanation": response[:200] if response else "Could not analyze sentiment"
-    }
-
-def extract_themes_with_openai(transcript: str) -> dict:
-    """Extract themes using OpenAI"""
-    if not model_available:
-        return extract_themes_basic(transcript)
-    
-    prompt = f"""Analyze this video transcript and identify the 5 main themes or topics discussed.
-    For each theme provide:
-    1. Theme name
-    2. Relevance score (0-1)
-    3. Brief description
-    
-    Also provide a list of 10 keywords.
-    
-    Respond in JSON format like:
-    {{
-        "themes": [
-            {{"theme": "Theme Name", "relevance": 0.9, "description": "Brief description"}},
-            ...
-        ],
-        "keywords": ["keyword1", "keyword2", ...]
-    }}
-    
-    Transcript: {transcript[:3000]}..."""
-    
-    response = call_openai(prompt)
-    
-    if response:
-        try:
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
-        except:
-            pass
-            
-    return extract_themes_basic(transcript)
-
-def extract_themes_basic(transcript: str) -> dict:
-    """Basic theme extraction using NLTK"""
+def analyze_via_backend(url: str) -> dict:
+    """Fetch metadata, transcript, summary, sentiment, themes and word cloud in one backend call"""
     try:
-        stop_words = set(stopwords.words('english'))
-        words = word_tokenize(transcript.lower())
-        filtered_words = [word for word in words 
-                        if word.isalnum() and 
-                        word not in stop_words and 
-                        len(word) > 3]
-        
-        word_counts = Counter(filtered_words)
-        most_common = word_counts.most_common(20)
-        
-        themes = []
-        for word, count in most_common[:5]:
-            relevance = min(0.9, count / (len(filtered_words) * 0.01)) if filtered_words else 0.5
-            themes.append({
-                'theme': word.title(),
-                'relevance': float(relevance),
-                'description': f"Mentioned {count} times"
-            })
-        
-        return {
-            'themes': themes,
-            'keywords': [word for word, _ in most_common[:10]]
-        }
-    except Exception as e:
-        return {'themes': [], 'keywords': []}
-
-def summarize_with_openai(transcript: str) -> str:
-    """Generate summary using OpenAI"""
-    if not model_available:
-        return transcript[:500] + "..." if len(transcript) > 500 else transcript
-    
-    prompt = f"""Create a concise summary of this video transcript in about 200 words.
-    Focus on the main points, key takeaways, and overall message.
-    
-    Transcript: {transcript[:4000]}..."""
-    
-    response = call_openai(prompt)
-    return response if response else transcript[:500] + "..."
+        response = httpx.post(f"{BACKEND_URL}/api/summary", json={"url": url},
+                              timeout=httpx.Timeout(BACKEND_TIMEOUT, connect=5.0))
+        response.raise_for_status()
+        return response.json()
+    except httpx.HTTPStatusError as e:
+        try:
+            detail = e.response.json().get('detail', e.response.text)
+        except ValueError:
+            detail = e.response.text
+        st.error(f"❌ Analysis failed: {str(detail)[:200]}")
+    except httpx.HTTPError as e:
+        st.error(f"❌ Could not reach the analysis backend at {BACKEND_URL}: {str(e)[:200]}")
+    return None
 
-def create_word_cloud(transcript: str) -> BytesIO:
-    """Create word cloud visualization"""
+def fetch_wordcloud(wordcloud_url: str) -> bytes:
+    """Download the word-cloud PNG here: BACKEND_URL may not be reachable from the viewer's browser"""
     try:
-        stop_words = set(stopwords.words('english'))
-        wordcloud = WordCloud(
-            width=800,
-            height=400,
-            background_color='white',
-            stopwords=stop_words,
-            max_words=100,
-            colormap='viridis'
-        ).generate(transcript)
-        
-        fig, ax = plt.subplots(figsize=(10, 5))
-        ax.imshow(wordcloud, interpolation='bilinear')
-        ax.axis('off')
-        
-        buf = BytesIO()
-        plt.savefig(buf, format='png', bbox_inches='tight', dpi=150)
-        buf.seek(0)
-        plt.close()
-        
-        return buf
-    except Exception as e:
-        st.error(f"Error creating word cloud: {str(e)}")
-        return None
+        response = httpx.get(f"{BACKEND_URL}{wordcloud_url}", timeout=30)
+        response.raise_for_status()
+        return response.content
+    except httpx.HTTPError as e:
+        st.warning(f"⚠️ Could not load the word cloud: {str(e)[:200]}")
+    return None
 
 # Main UI
 st.title("🎥 Video Analysis Tool")
@@ -422,12 +227,8 @@ with st.sidebar:
         st.warning("⚠️ OpenAI API Key Missing")
         st.markdown("[Get your API key](https://platform.openai.com/api-keys)")
     
-    # YouTube Status
-    if YOUTUBE_API_KEY:
-        st.success("✅ YouTube API Connected")
-    else:
-        st.info("ℹ️ YouTube API Optional")
-        st.markdown("[Enable YouTube API](https://console.cloud.google.com/apis/library/youtube.googleapis.com)")
+    # Backend (transcripts, YouTube metadata and transcript analysis)
+    st.info(f"ℹ️ Analysis backend: {BACKEND_URL}")
     
     # Insights section
     st.divider()
@@ -475,11 +276,15 @@ if analyze_button and url:
     if not video_id:
         st.error("Invalid YouTube URL. Please check the URL and try again.")
     else:
-        # Get video info first
-        with st.spinner("Fetching video information..."):
-            video_info = get_video_info(video_id)
+        # One backend call: metadata, transcript and AI analysis run concurrently there
+        with st.spinner("Analyzing video..."):
+            analysis = analyze_via_backend(url)
         
-        if video_info and video_info.get('title'):
+        if analysis:
+            video_info = analysis.get('meta') or {}
+            if analysis.get('transcript_error'):
+                st.warning(f"⚠️ {analysis['transcript_error']} - showing metadata-based analysis only")
+            
             # Display video info
             col1, col2, col3 = st.columns([2, 1, 1])
             
@@ -495,50 +300,16 @@ if analyze_button and url:
                 if video_info.get('likes'):
                     st.metric("Likes", f"{video_info['likes']:,}")
             
-            # Analyze what the video is about
-            with st.spinner("Analyzing what this video is about..."):
-                content_analysis = analyze_video_content(video_id, video_info)
+            # Analyze what the video is about (streamed as it is generated)
+            st.markdown("---")
+            st.markdown("## 📊 Video Content Analysis")
+            content_analysis = analyze_video_content(video_id, video_info)
             
-            if content_analysis:
-                st.success("✅ Video content analyzed!")
-                
-                # Display the analysis
-                st.markdown("---")
-                st.markdown("## 📊 Video Content Analysis")
-                st.markdown(content_analysis['raw_analysis'])
-                
-                # Try to get transcript for deeper analysis
-                with st.expander("🔍 Want deeper analysis with transcript?"):
-                    st.info("For sentiment analysis, themes, and summaries, we need the transcript.")
-                    
-                    if st.button("Extract and Analyze Transcript"):
-                        with st.spinner("Extracting transcript..."):
-                            transcript, _ = extract_transcript(video_id)
-                        
-                        if transcript:
-                            # Store analysis
-                            analysis = {
-                                'video_id': video_id,
-                                'transcript': transcript,
-                                'video_info': video_info,
-                                'content_analysis': content_analysis
-                            }
-                            
-                            # Perform deeper analysis
-                            with st.spinner("Analyzing transcript..."):
-                                analysis['sentiment'] = analyze_sentiment_with_openai(transcript)
-                                analysis['themes'] = extract_themes_with_openai(transcript)
-                                analysis['summary'] = summarize_with_openai(transcript)
-                            
-                            st.session_state.analyzed_videos[video_id] = analysis
-                            st.success("✅ Detailed analysis complete!")
-                            st.rerun()
-                        else:
-                            st.warning("Couldn't extract transcript.")
-            else:
-                st.error("Could not analyze video content.")
-        else:
-            st.error("Could not fetch video information.")
+            analysis['content_analysis'] = content_analysis
+            if analysis.get('wordcloud_url'):
+                analysis['wordcloud_png'] = fetch_wordcloud(analysis['wordcloud_url'])
+            st.session_state.analyzed_videos[video_id] = analysis
+            st.success("✅ Analysis complete!")
 
 # Display results if we have analysis
 if url and extract_video_id(url) in st.session_state.analyzed_videos:
@@ -579,7 +350,8 @@ if url and extract_video_id(url) in st.session_state.analyzed_videos:
         st.subheader("Key Themes")
         if 'themes' in analysis and analysis['themes'].get('themes'):
             for theme in analysis['themes']['themes']:
-                with st.expander(f"**{theme['theme']}** - {theme.get('relevance', 0)*100:.0f}% relevance"):
+                name = theme.get('name') or theme.get('theme', 'Theme')
+                with st.expander(f"**{name}** - {theme.get('relevance', 0)*100:.0f}% relevance"):
                     st.write(theme.get('description', 'No description'))
             
             if analysis['themes'].get('keywords'):
@@ -588,10 +360,8 @@ if url and extract_video_id(url) in st.session_state.analyzed_videos:
     
     with tabs[3]:
         st.subheader("Word Cloud")
-        if 'transcript' in analysis:
-            wordcloud = create_word_cloud(analysis['transcript'])
-            if wordcloud:
-                st.image(wordcloud, use_column_width=True)
+        if analysis.get('wordcloud_png'):
+            st.image(analysis['wordcloud_png'], use_column_width=True)
     
     with tabs[4]:
         st.subheader("Transcript")
@@ -3,176 +3,690 @@ orchestrator.py · FastAPI backend for YouTube-AI dashboard
 """
 
 from __future__ import annotations
-import os, re, json, base64, io, asyncio
+import os, re, io, sys, time, asyncio, hashlib, functools, inspect, logging, multiprocessing
+from collections import Counter
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from pathlib import Path
 from typing import Dict, Any
 
+import httpx
+import orjson
+from diskcache import Cache
 from dotenv import load_dotenv
 from pydantic import BaseModel
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 
 # ────── OpenAI (new SDK) ─────────────────────────────────────
 from openai import AsyncOpenAI          # ✅ NEW import
+from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+from tenacity import (
+    retry, retry_if_exception_type, retry_if_not_exception_type, stop_after_attempt,
+    wait_random_exponential,
+)
 
-# ────── Google Gemini (optional) & others ───────────────────
-import google.generativeai as genai
+# ────── YouTube ──────────────────────────────────────────────
+# wordcloud/matplotlib are imported where used: they add seconds to worker
+# boot and only the word-cloud processes need them.
 from youtube_transcript_api import YouTubeTranscriptApi
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-
-# NLP & plotting
-import nltk, matplotlib.pyplot as plt
-from nltk.corpus import stopwords
-from wordcloud import WordCloud
 
 # ────── Env & keys ──────────────────────────────────────────
 load_dotenv()
+log = logging.getLogger("orchestrator")
 OPENAI_API_KEY  = os.getenv("OPENAI_API_KEY", "")
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY", "")
 
-client = AsyncOpenAI(api_key=OPENAI_API_KEY)   # ✅ instantiate once
-
-# ────── FastAPI setup & CORS ────────────────────────────────
-app = FastAPI(title="Video-Analysis-API")
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],          # or ["http://localhost:3000"]
-    allow_credentials=False,      # must be False with "*"
-    allow_methods=["*"],
-    allow_headers=["*"],
+# ✅ instantiate once; HTTP/2 multiplexes concurrent calls over one pooled connection
+client = AsyncOpenAI(
+    api_key=OPENAI_API_KEY,
+    http_client=httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=50, keepalive_expiry=60),
+        timeout=httpx.Timeout(30.0, connect=5.0),     # per read; see _create_completion
+    ),
 )
 
-# ────── Ensure NLTK data ────────────────────────────────────
-for pkg in ("punkt", "stopwords"):
-    try:
-        nltk.data.find(
-            f"tokenizers/{pkg}" if pkg == "punkt" else f"corpora/{pkg}"
-        )
-    except LookupError:
-        nltk.download(pkg, quiet=True)
+# ────── Disk cache (OpenAI / YouTube results) ───────────────
+DATA_DIR  = Path(os.getenv("DATA_DIR", "./data")).resolve()   # absolute: workers may chdir
+CACHE_TTL = int(os.getenv("CACHE_TTL", 7 * 24 * 3600))     # seconds
+META_TTL  = int(os.getenv("META_TTL", 24 * 3600))          # views/likes go stale fast
+TRANSCRIPT_TTL = int(os.getenv("TRANSCRIPT_TTL", 7 * 24 * 3600))
+cache = Cache(str(DATA_DIR / "cache"))
+cache_stats: Counter = Counter()      # "<prefix>.hit" / "<prefix>.miss", per process
+
+def _digest(*parts: Any) -> str:
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+def disk_cached(prefix: str, expire: int = CACHE_TTL):
+    """Memoize a sync or async function in `cache`; empty results are not stored."""
+    def deco(fn):
+        sig = inspect.signature(fn)
+
+        def cache_key(*args, **kwargs) -> str:
+            bound = sig.bind(*args, **kwargs); bound.apply_defaults()
+            return f"{prefix}:{_digest(*bound.arguments.values())}"
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                key = cache_key(*args, **kwargs)
+                hit = cache.get(key)
+                if hit is not None:
+                    cache_stats[f"{prefix}.hit"] += 1
+                    return hit
+                cache_stats[f"{prefix}.miss"] += 1
+                out = await fn(*args, **kwargs)
+                if out:
+                    cache.set(key, out, expire=expire)
+                return out
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                key = cache_key(*args, **kwargs)
+                hit = cache.get(key)
+                if hit is not None:
+                    cache_stats[f"{prefix}.hit"] += 1
+                    return hit
+                cache_stats[f"{prefix}.miss"] += 1
+                out = fn(*args, **kwargs)
+                if out:
+                    cache.set(key, out, expire=expire)
+                return out
+
+        wrapper.cache_key = cache_key
+        return wrapper
+    return deco
+
+# ────── Stopwords ───────────────────────────────────────────
+# NLTK's English list, restricted to what _WORD_RE can match (4+ letters):
+# no corpus download or disk read at startup
+_STOPWORDS = frozenset("""
+    myself ours ourselves your yours yourself yourselves himself hers herself itself
+    they them their theirs themselves what which whom this that these those
+    were been being have having does doing because until while about against
+    between into through during before after above below from down over under
+    again further then once here there when where both each more most other
+    some such only same than very will just should with aren couldn didn doesn
+    hadn hasn haven mightn mustn needn shan shouldn wasn weren wouldn
+""".split())
 
 # ────── Request models ──────────────────────────────────────
 class SummaryReq(BaseModel):
     url: str
+    fast: bool = True     # False → OpenAI Batch API (cheaper, minutes-to-hours latency)
+
+class BatchSummaryReq(BaseModel):
+    urls: list[str]
+    fast: bool = True
 
 class QueryReq(BaseModel):
     transcript: str
     query: str
 
 # ────── Helper: YouTube URL → ID ────────────────────────────
-_ID_PAT = [
-    r"(?:youtube\.com/watch\?v=)([\w\-]{11})",
-    r"(?:youtu\.be/)([\w\-]{11})",
-    r"(?:youtube\.com/embed/)([\w\-]{11})",
-    r"(?:youtube\.com/v/)([\w\-]{11})",
-]
+_VIDEO_ID_RE = re.compile(r"(?:youtube\.com/(?:watch\?v=|embed/|v/)|youtu\.be/)([\w\-]{11})")
+
 def extract_video_id(url: str) -> str:
-    for p in _ID_PAT:
-        m = re.search(p, url)
-        if m:
-            return m.group(1)
+    m = _VIDEO_ID_RE.search(url)
+    if m:
+        return m.group(1)
     raise HTTPException(400, "Invalid YouTube URL")
 
 # ────── Video metadata via YouTube Data API ─────────────────
-def get_video_info(video_id: str) -> Dict[str, Any]:
+_YT_VIDEOS_URL = "https://www.googleapis.com/youtube/v3/videos"
+# plain REST over a shared async client: no discovery doc, no blocking httplib2
+_httpx = httpx.AsyncClient(timeout=10, http2=True)
+
+_YT_PAGE = 50       # videos.list takes up to 50 ids per call, still 1 quota unit
+
+async def _video_items(ids: list[str]) -> list[Dict[str, Any]]:
+    try:
+        # key in a header, not the query string: URLs end up in exception messages
+        r = await _httpx.get(
+            _YT_VIDEOS_URL,
+            params={"part": "snippet,statistics,contentDetails", "id": ",".join(ids)},
+            headers={"X-Goog-Api-Key": YOUTUBE_API_KEY},
+        )
+        r.raise_for_status()
+        return orjson.loads(r.content).get("items") or []
+    except httpx.HTTPError as e:
+        # never the error's repr/str: it carries the request URL
+        status = e.response.status_code if isinstance(e, httpx.HTTPStatusError) else None
+        log.warning("videos.list failed for %d id(s): %s (status %s)",
+                    len(ids), type(e).__name__, status)
+        return []
+
+def _parse_video_item(it: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "title": it["snippet"]["title"],
+        "channel": it["snippet"]["channelTitle"],
+        "views": int(it["statistics"].get("viewCount", 0)),
+        "likes": int(it["statistics"].get("likeCount", 0)),
+        "published": it["snippet"]["publishedAt"],
+        "duration": it["contentDetails"]["duration"],
+        "description": it["snippet"]["description"][:500],
+        "thumbnail": it["snippet"]["thumbnails"]["high"]["url"],
+    }
+
+async def get_video_info(video_id: str) -> Dict[str, Any]:
     if not YOUTUBE_API_KEY:
         return {"title": f"Video {video_id}", "description": "YOUTUBE_API_KEY missing"}
-    try:
-        yt = build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
-        res = yt.videos().list(part="snippet,statistics,contentDetails", id=video_id).execute()
-        if not res["items"]:
-            return {}
-        it = res["items"][0]
-        return {
-            "title": it["snippet"]["title"],
-            "channel": it["snippet"]["channelTitle"],
-            "views": int(it["statistics"].get("viewCount", 0)),
-            "likes": int(it["statistics"].get("likeCount", 0)),
-            "published": it["snippet"]["publishedAt"],
-            "duration": it["contentDetails"]["duration"],
-            "description": it["snippet"]["description"][:500],
-            "thumbnail": it["snippet"]["thumbnails"]["high"]["url"],
-        }
-    except HttpError:
-        return {}
+    return await _video_info(video_id)
+
+@disk_cached("meta", expire=META_TTL)
+async def _video_info(video_id: str) -> Dict[str, Any]:
+    items = await _video_items([video_id])
+    return _parse_video_item(items[0]) if items else {}
+
+async def get_videos_info(ids: list[str]) -> Dict[str, Dict[str, Any]]:
+    """Metadata for many videos: disk cache first, then one videos.list call per 50 misses."""
+    if not YOUTUBE_API_KEY:
+        return {v: await get_video_info(v) for v in ids}
+    out = {v: cache.get(_video_info.cache_key(v)) for v in ids}
+    missing = [v for v, meta in out.items() if meta is None]
+    cache_stats["meta.hit"] += len(out) - len(missing)
+    cache_stats["meta.miss"] += len(missing)
+    pages = await asyncio.gather(*(
+        _video_items(missing[i:i + _YT_PAGE]) for i in range(0, len(missing), _YT_PAGE)
+    ))
+    for items in pages:
+        for it in items:
+            out[it["id"]] = meta = _parse_video_item(it)
+            cache.set(_video_info.cache_key(it["id"]), meta, expire=META_TTL)
+    return {v: meta or {} for v, meta in out.items()}
 
 # ────── Transcript extraction / translation ────────────────
-async def fetch_transcript(video_id: str) -> str:
+def _entries_to_text(data) -> str:
+    """Join transcript segments: dicts (<1.0 API) or snippet objects (>=1.0)."""
+    return " ".join(
+        s for s in ((e["text"] if isinstance(e, dict) else e.text).strip() for e in data) if s
+    )
+
+TRANSCRIPT_PROBES = int(os.getenv("TRANSCRIPT_PROBES", 3))   # candidates fetched in parallel
+
+async def _first_transcript(candidates) -> str:
+    """Fetch the top candidates concurrently; the first non-empty text wins.
+
+    Losers are cancelled, but their worker threads still run to completion."""
+    tasks = [asyncio.create_task(asyncio.to_thread(t.fetch)) for t in candidates[:TRANSCRIPT_PROBES]]
     try:
+        for fut in asyncio.as_completed(tasks):
+            try:
+                text = _entries_to_text(await fut)
+            except Exception as e:
+                log.debug("transcript candidate failed: %r", e)
+                continue
+            if text:
+                return text
+        return ""
+    finally:
+        for task in tasks:
+            task.cancel()
+
+def _transcript_candidates(video_id: str):
+    """Blocking listing + ranking, run as one worker-thread call.
+
+    Returns (English tracks, fallbacks); manual before auto-generated in each,
+    fallbacks are English translations first, then untranslated tracks."""
+    if hasattr(YouTubeTranscriptApi, "list_transcripts"):   # youtube-transcript-api < 1.0
         tl = YouTubeTranscriptApi.list_transcripts(video_id)
-        for t in tl:                          # prefer English
-            if t.language_code.startswith("en"):
-                return " ".join(seg.text for seg in t.fetch())
-        t = tl[0]                             # translate if possible
-        if t.is_translatable:
-            t = t.translate("en")
-        return " ".join(seg.text for seg in t.fetch())
+    else:
+        tl = YouTubeTranscriptApi().list(video_id)          # own requests.Session per lookup
+    english, translated, other = [], [], []
+    for t in sorted(tl, key=lambda t: t.is_generated):
+        if t.language_code.lower().startswith("en"):
+            english.append(t)
+            continue
+        try:
+            translated.append(t.translate("en"))
+        except Exception:                     # not translatable / no English target
+            other.append(t)
+    return english, translated + other
+
+@disk_cached("transcript", expire=TRANSCRIPT_TTL)
+async def fetch_transcript(video_id: str) -> str:
+    try:
+        # youtube-transcript-api is blocking HTTP → keep it off the event loop
+        english, fallbacks = await asyncio.to_thread(_transcript_candidates, video_id)
+        text = await _first_transcript(english) or await _first_transcript(fallbacks)
     except Exception:
+        log.exception("transcript lookup failed for %s", video_id)
+        text = ""
+    if not text:
         raise HTTPException(status_code=500, detail="Transcript unavailable")
+    return text
 
 # ────── OpenAI chat helper (new SDK) ────────────────────────
-async def openai_chat(prompt: str, model="gpt-3.5-turbo", temp=0.5, max_tokens=350):
-    resp = await client.chat.completions.create(
-        model=model,
-        messages=[{"role": "user", "content": prompt}],
-        temperature=temp,
-        max_tokens=max_tokens,
-    )
-    return resp.choices[0].message.content.strip()
+def _chat_params(
+    prompt: str, model="gpt-3.5-turbo", temp=0.5, max_tokens=350, json_mode=False
+) -> Dict[str, Any]:
+    params = {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": temp,
+        "max_tokens": max_tokens,
+    }
+    if json_mode:
+        params["response_format"] = {"type": "json_object"}
+    return params
 
-# Sentiment / Themes / Summary prompts
-async def analyze_sentiment(text: str):
-    prompt = (
-        "Analyze sentiment (positive / neutral / negative) and return JSON with "
-        "keys overall, score (0-1), explanation.\n\n" + text[:3000]
-    )
-    raw = await openai_chat(prompt, temp=0.3, max_tokens=300)
+# Cap in-flight requests and back off on 429 / connection errors / 5xx
+# (tenacity owns retries, so the SDK's own retry loop is switched off per call)
+OPENAI_CONCURRENCY = int(os.getenv("OPENAI_CONCURRENCY", 8))
+_openai_sem = asyncio.Semaphore(OPENAI_CONCURRENCY)
+# ...and the request rate under the account's RPM limit (0 = unlimited); every
+# attempt, retries included, takes a token. The Batch API has its own quota.
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", 0))
+
+class _TokenBucket:
+    """`per_minute` tokens, refilled continuously; acquire() waits for one."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = self.tokens = per_minute
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if not self.capacity:
+            return
+        async with self.lock:                     # waiters are served in order
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.capacity / 60
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) * 60 / self.capacity)
+
+_openai_rpm = _TokenBucket(OPENAI_RPM)
+# A non-streaming reply sends nothing until generation finishes, so it needs a
+# far longer read timeout than a stream's gap between chunks.
+OPENAI_READ_TIMEOUT = float(os.getenv("OPENAI_READ_TIMEOUT", 120))
+
+@retry(
+    wait=wait_random_exponential(multiplier=1, max=30),
+    stop=stop_after_attempt(5),
+    # a timed-out request may still be generated (and billed): don't send it again
+    retry=retry_if_exception_type((RateLimitError, APIConnectionError, InternalServerError))
+          & retry_if_not_exception_type(APITimeoutError),
+    reraise=True,
+)
+async def _create_completion(**params):
+    """Streams are opened without the semaphore: the caller holds it while reading."""
+    await _openai_rpm.acquire()
+    if params.get("stream"):
+        return await client.with_options(max_retries=0).chat.completions.create(**params)
+    opts = {"max_retries": 0, "timeout": httpx.Timeout(OPENAI_READ_TIMEOUT, connect=5.0)}
+    async with _openai_sem:
+        return await client.with_options(**opts).chat.completions.create(**params)
+
+async def _complete(params: Dict[str, Any]) -> tuple[str, str]:
+    """One uncached completion → (reply text, finish_reason)."""
+    resp = await _create_completion(**params)
+    choice = resp.choices[0]
+    return choice.message.content.strip(), choice.finish_reason
+
+@disk_cached("chat")
+async def openai_chat(prompt: str, model="gpt-3.5-turbo", temp=0.5, max_tokens=350,
+                      json_mode=False):
+    reply, _ = await _complete(_chat_params(prompt, model, temp, max_tokens, json_mode))
+    return reply
+
+async def openai_chat_stream(prompt: str, model="gpt-3.5-turbo", temp=0.5, max_tokens=350):
+    """Yield reply text as it is generated; the full reply lands in openai_chat's cache."""
+    key = openai_chat.cache_key(prompt, model, temp, max_tokens)
+    hit = cache.get(key)
+    if hit is not None:
+        yield hit
+        return
+    parts = []
+    async with _openai_sem:           # counted against OPENAI_CONCURRENCY until fully read
+        stream = await _create_completion(
+            **_chat_params(prompt, model, temp, max_tokens, False), stream=True
+        )
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                yield delta
+    reply = "".join(parts).strip()
+    if reply:                         # like disk_cached: never store an empty reply
+        cache.set(key, reply, expire=CACHE_TTL)
+
+# ────── Token budgeting ─────────────────────────────────────
+MAX_INPUT_TOKENS = int(os.getenv("MAX_INPUT_TOKENS", 12000))   # of 16k context
+
+@functools.lru_cache(maxsize=1)
+def _encoding():
+    """Warmed in a worker thread at startup: a cold tiktoken cache downloads the BPE
+    file (point TIKTOKEN_CACHE_DIR at a pre-seeded directory on offline hosts)."""
+    import tiktoken
+    return tiktoken.encoding_for_model("gpt-3.5-turbo")
+
+def truncate_tokens(text: str, n_tokens: int = MAX_INPUT_TOKENS) -> str:
+    """Cut `text` to `n_tokens`. Blocking (encode, maybe the BPE load): run it via to_thread."""
+    # tokens average ~4 chars: past 8 per token the budget is spent anyway,
+    # so don't encode the rest of a long transcript
+    text = text[:n_tokens * 8]
     try:
-        return json.loads(re.search(r"\{.*\}", raw, re.DOTALL)[0])
-    except Exception:
-        return {"overall": "neutral", "score": 0.5, "explanation": raw[:200]}
+        enc = _encoding()
+    except Exception as e:            # BPE file not cached and no network
+        log.warning("tiktoken unavailable (%s), cutting by characters", type(e).__name__)
+        return text[:n_tokens * 4]
+    toks = enc.encode(text)
+    return text if len(toks) <= n_tokens else enc.decode(toks[:n_tokens])
 
-async def extract_themes(text: str):
-    prompt = (
-        "Identify 5 main themes (name, relevance 0-1, description) and 10 keywords. "
-        "Return JSON with keys themes, keywords.\n\n" + text[:3000]
-    )
-    raw = await openai_chat(prompt, max_tokens=400)
+# ────── OpenAI Batch API helper (bulk, half price) ──────────
+BATCH_POLL_SECS = float(os.getenv("BATCH_POLL_SECS", 10))
+_BATCH_DONE = {"completed", "failed", "expired", "cancelled"}
+
+def _batch_row_error(row: Dict[str, Any]) -> str:
+    resp = row.get("response") or {}
+    err = row.get("error") or (resp.get("body") or {}).get("error") or {}
+    return err.get("message") or f"status {resp.get('status_code')}"
+
+async def openai_batch(jobs: Dict[str, Dict[str, Any]]):
+    """Run {custom_id: _chat_params kwargs} as one Batch API job
+    → ({custom_id: (reply, finish_reason)}, {custom_id: error message}).
+
+    Every custom_id lands in exactly one of the two dicts. Replies are not
+    cached here, callers decide what is worth keeping (see _batch_reply).
+    The in-flight batch id is cached: a retried request (client timeout,
+    reload) resumes polling the same job instead of paying for a second one.
+    """
+    out: Dict[str, tuple[str, str]] = {}
+    errors: Dict[str, str] = {}
+    if not jobs:
+        return out, errors
+    lines = [
+        orjson.dumps({
+            "custom_id": cid, "method": "POST", "url": "/v1/chat/completions",
+            "body": _chat_params(**kw),
+        })
+        for cid, kw in jobs.items()
+    ]
+
+    inflight = "batch:" + _digest(*sorted((cid, _digest(kw)) for cid, kw in jobs.items()))
+    batch_id = cache.get(inflight)
+    if batch_id:
+        batch = await client.batches.retrieve(batch_id)
+    else:
+        upload = await client.files.create(
+            file=("batch.jsonl", b"\n".join(lines)), purpose="batch"
+        )
+        batch = await client.batches.create(
+            input_file_id=upload.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        cache.set(inflight, batch.id, expire=25 * 3600)     # completion window + slack
+    while batch.status not in _BATCH_DONE:
+        await asyncio.sleep(BATCH_POLL_SECS)
+        batch = await client.batches.retrieve(batch.id)
+    cache.delete(inflight)
+    if batch.status != "completed":
+        raise HTTPException(502, f"OpenAI batch {batch.status}")
+
+    # successes go to the output file, failed requests to the error file
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        result = await client.files.content(file_id)
+        for line in result.content.splitlines():
+            if not line.strip():
+                continue
+            row = orjson.loads(line)
+            resp = row.get("response") or {}
+            if resp.get("status_code") == 200:
+                choice = resp["body"]["choices"][0]
+                out[row["custom_id"]] = choice["message"]["content"].strip(), choice["finish_reason"]
+            else:
+                errors[row["custom_id"]] = _batch_row_error(row)
+    for cid in jobs:
+        if cid not in out:
+            errors.setdefault(cid, "missing from batch output")
+    return out, errors
+
+def _batch_reply(result, custom_id: str) -> tuple[str, str]:
+    """Pick one (reply, finish_reason) out of openai_batch's result; 502 if it failed."""
+    replies, errors = result
+    if custom_id not in replies:
+        raise HTTPException(502, f"OpenAI batch request failed: {errors[custom_id]}")
+    return replies[custom_id]
+
+_SUMMARY_PROMPT = "Create a concise (~200 word) summary:\n\n"
+
+# Summary + sentiment + themes in one fused prompt (transcript sent once)
+_ANALYSIS_PROMPT = (
+    "Analyze the video transcript below and return a JSON object with keys:\n"
+    '- "summary": a concise (~200 word) summary\n'
+    '- "sentiment": {"overall": "positive" | "neutral" | "negative", '
+    '"score": 0-1, "explanation": string}\n'
+    '- "themes": the 5 main themes, each {"name": string, "relevance": 0-1, '
+    '"description": string}\n'
+    '- "keywords": 10 keywords\n\n'
+    "Transcript:\n"
+)
+
+def _analysis_job(text: str) -> Dict[str, Any]:
+    return {
+        "prompt": _ANALYSIS_PROMPT + text,
+        "temp": 0.3, "max_tokens": 900, "json_mode": True,
+    }
+
+def _parse_json(raw: str) -> Dict[str, Any]:
+    # JSON mode guarantees an object unless the reply was cut off at max_tokens
     try:
-        return json.loads(re.search(r"\{.*\}", raw, re.DOTALL)[0])
-    except Exception:
-        return {"themes": [], "keywords": []}
+        data = orjson.loads(raw)
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+def _parse_analysis(raw: str):
+    """Split the fused JSON reply into the (summary, sentiment, themes) response keys."""
+    data = _parse_json(raw)
+    sentiment = data.get("sentiment")
+    if not isinstance(sentiment, dict):
+        sentiment = {"overall": "neutral", "score": 0.5, "explanation": raw[:200]}
+    themes = {"themes": data.get("themes") or [], "keywords": data.get("keywords") or []}
+    return data.get("summary", ""), sentiment, themes
+
+# One entry per video: (prompt digest, raw reply). Keyed by video id rather than
+# by prompt so DELETE /api/cache/{id} can reach it; the digest catches a changed prompt.
+def _analysis_key(video_id: str) -> str:
+    return f"analysis:{video_id}"
+
+def _cached_analysis(video_id: str, job: Dict[str, Any]) -> str | None:
+    hit = cache.get(_analysis_key(video_id))
+    if hit is not None and hit[0] == _digest(job):
+        cache_stats["analysis.hit"] += 1
+        return hit[1]
+    cache_stats["analysis.miss"] += 1
+    return None
+
+def _store_analysis(video_id: str, job: Dict[str, Any], raw: str, finish_reason: str):
+    # a reply cut off at max_tokens (or otherwise not a JSON object) parses to an
+    # empty summary + neutral sentiment: never pin that for a whole CACHE_TTL
+    if finish_reason != "length" and _parse_json(raw):
+        cache.set(_analysis_key(video_id), (_digest(job), raw), expire=CACHE_TTL)
 
-async def summarise_transcript(text: str):
-    prompt = "Create a concise (~200 word) summary:\n\n" + text[:4000]
-    return await openai_chat(prompt, max_tokens=350)
+async def analyze_all(video_id: str, text: str, fast: bool = True):
+    """One LLM call → (summary, sentiment, themes); fast=False goes through the Batch API.
+
+    `text` should already be cut to the token budget (see truncate_tokens).
+    """
+    job = _analysis_job(text)
+    raw = _cached_analysis(video_id, job)
+    if raw is None:
+        if fast:
+            raw, finish_reason = await _complete(_chat_params(**job))
+        else:
+            raw, finish_reason = _batch_reply(await openai_batch({video_id: job}), video_id)
+        _store_analysis(video_id, job, raw, finish_reason)
+    return _parse_analysis(raw)
+
+# ────── Local word counts (themes fallback + word cloud) ─────
+_WORD_RE = re.compile(r"[a-z]{4,}")
+
+def bag_of_words(text: str) -> Counter:
+    """Stopword-filtered counts of lowercase 4+ letter words."""
+    return Counter(w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS)
+
+def analyze_transcript_local(text: str) -> Dict[str, Any]:
+    """One counting pass → keyword themes, keywords and word-cloud frequencies."""
+    freqs = bag_of_words(text)
+    total = sum(freqs.values())
+    top = freqs.most_common(10)
+    return {
+        "themes": [
+            {"name": w.title(), "relevance": min(0.9, c / (total * 0.01)),
+             "description": f"Mentioned {c} times"}
+            for w, c in top[:5]
+        ],
+        "keywords": [w for w, _ in top],
+        "wc_freqs": freqs,
+    }
 
 # ────── Word-cloud helper ───────────────────────────────────
-def make_wordcloud(text: str) -> str:
-    stop_words = set(stopwords.words("english"))
-    wc = WordCloud(
+# Rendering + PNG encode is pure CPU → worker processes, not the event loop.
+# forkserver: by the time workers start this process already runs threads
+# (to_thread transcript fetches, httpx, sqlite), and fork() would copy their locks.
+# Windows has no forkserver; spawn is just as safe, only slower to start.
+WC_WORKERS = int(os.getenv("WC_WORKERS", os.cpu_count() or 1))
+_WC_START = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+_WC_POOL = ProcessPoolExecutor(
+    max_workers=WC_WORKERS, mp_context=multiprocessing.get_context(_WC_START)
+)
+
+def _mpl_dirs_writable() -> bool:
+    """Whether matplotlib's default config and cache dirs (no MPLCONFIGDIR) are usable."""
+    try:
+        home = Path.home()
+    except RuntimeError:
+        return False
+    if sys.platform.startswith(("linux", "freebsd")):
+        dirs = [Path(os.getenv("XDG_CONFIG_HOME") or home / ".config") / "matplotlib",
+                Path(os.getenv("XDG_CACHE_HOME") or home / ".cache") / "matplotlib"]
+    else:
+        dirs = [home / ".matplotlib"]
+    try:
+        for d in dirs:
+            d.mkdir(parents=True, exist_ok=True)
+    except OSError:
+        return False
+    return all(os.access(d, os.W_OK) for d in dirs)
+
+@functools.lru_cache(maxsize=1)
+def _wordcloud():
+    """One WordCloud per worker process (font + colormap setup happens once)."""
+    # matplotlib falls back to a throwaway temp dir when $HOME isn't writable
+    # (containers) and rebuilds its font cache on every start; keep it under
+    # DATA_DIR instead. Only then: MPLCONFIGDIR also hides the user's matplotlibrc.
+    if "MPLCONFIGDIR" not in os.environ and not _mpl_dirs_writable():
+        os.environ["MPLCONFIGDIR"] = str(DATA_DIR / "matplotlib")
+    import matplotlib; matplotlib.use("Agg")    # headless: skip GUI backend probing
+    from wordcloud import WordCloud
+    return WordCloud(
         width=800, height=400, background_color="white",
-        stopwords=stop_words, max_words=120, colormap="viridis"
-    ).generate(text)
-    fig, ax = plt.subplots(figsize=(10, 5)); ax.imshow(wc); ax.axis("off")
-    buf = io.BytesIO(); plt.savefig(buf, format="png", bbox_inches="tight"); plt.close(fig)
-    return base64.b64encode(buf.getvalue()).decode()
+        max_words=120, colormap="viridis"
+    )
+
+def _warm_wordcloud_worker() -> None:
+    _wordcloud()
+
+def make_wordcloud(freqs: Counter) -> bytes:
+    # pre-counted frequencies skip WordCloud's own tokenize/count pass
+    wc = _wordcloud().generate_from_frequencies(freqs)
+    # zlib level 1: roughly half the encode time of the default 6 for a slightly larger PNG
+    buf = io.BytesIO(); wc.to_image().save(buf, format="PNG", optimize=False, compress_level=1)
+    return buf.getvalue()
+
+def _wordcloud_key(video_id: str) -> str:
+    return f"wordcloud:{video_id}"
+
+def _png_version(png: bytes) -> str:
+    return hashlib.blake2b(png, digest_size=8).hexdigest()
+
+async def render_wordcloud(video_id: str, freqs: Counter) -> str | None:
+    """Render (once per cache lifetime) and store the PNG; returns its URL, None if no words.
+
+    The URL carries a content hash, so a re-rendered image never hits a stale browser cache.
+    """
+    key = _wordcloud_key(video_id)
+    png = cache.get(key)
+    if png is None:
+        if not freqs:
+            return None
+        png = await asyncio.get_running_loop().run_in_executor(_WC_POOL, make_wordcloud, freqs)
+        cache.set(key, png, expire=CACHE_TTL)
+    return f"/api/wordcloud/{video_id}.png?v={_png_version(png)}"
+
+# ────── FastAPI setup & CORS ────────────────────────────────
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # boot the word-cloud workers and load the BPE file now, not inside a request
+    warm = (_WC_POOL.submit(_warm_wordcloud_worker) for _ in range(WC_WORKERS))
+    enc, *workers = await asyncio.gather(
+        asyncio.to_thread(_encoding), *map(asyncio.wrap_future, warm), return_exceptions=True
+    )
+    if isinstance(enc, Exception):
+        log.error("tiktoken encoding not loaded, prompts are cut by characters until it is",
+                  exc_info=enc)
+    for err in workers:
+        if isinstance(err, Exception):
+            log.error("word-cloud worker failed to start", exc_info=err)
+    yield
+    _WC_POOL.shutdown(wait=False, cancel_futures=True)
+    await _httpx.aclose()
+    await client.close()
+
+app = FastAPI(title="Video-Analysis-API", default_response_class=ORJSONResponse, lifespan=lifespan)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],          # or ["http://localhost:3000"]
+    allow_credentials=False,      # must be False with "*"
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
 
 # ────── /api/summary endpoint ───────────────────────────────
-@app.post("/api/summary")
-async def api_summary(req: SummaryReq):
-    vid = extract_video_id(req.url)
-    meta = get_video_info(vid)
-    transcript = await fetch_transcript(vid)
+async def _summarize(vid: str, meta, analyze) -> Dict[str, Any]:
+    """Transcript → analysis + word cloud; `meta` (awaitable) resolves alongside.
 
-    # run LLM tasks concurrently
-    s_task = asyncio.create_task(summarise_transcript(transcript))
-    p_task = asyncio.create_task(analyze_sentiment(transcript))
-    t_task = asyncio.create_task(extract_themes(transcript))
+    `analyze(vid, text)` returns (summary, sentiment, themes), see analyze_all.
+    """
+    # metadata isn't needed until the response: let it run behind transcript + LLM
+    meta_task = asyncio.ensure_future(meta)
+    try:
+        transcript = await fetch_transcript(vid)
+    except HTTPException as e:
+        # no transcript: metadata is still worth returning (title, channel, stats)
+        return {
+            "videoId": vid,
+            "timestamp": datetime.utcnow().isoformat(),
+            "meta": await meta_task,
+            "transcript_error": e.detail,
+        }
+    except BaseException:
+        meta_task.cancel()
+        raise
 
-    summary, sentiment, themes = await asyncio.gather(s_task, p_task, t_task)
-    wc_b64 = make_wordcloud(transcript)
+    text = await asyncio.to_thread(truncate_tokens, transcript)
+    local = analyze_transcript_local(transcript)
+    # word cloud renders in a worker process while the LLM call is in flight
+    (summary, sentiment, themes), wc_url, meta = await asyncio.gather(
+        analyze(vid, text),
+        render_wordcloud(vid, local["wc_freqs"]),
+        meta_task,
+    )
+    if not themes["themes"]:        # LLM reply unusable → keyword-frequency themes
+        themes = {"themes": local["themes"], "keywords": local["keywords"]}
 
     return {
         "videoId": vid,
@@ -182,21 +696,142 @@ async def api_summary(req: SummaryReq):
         "summary": summary,
         "sentiment": sentiment,
         "themes": themes,
-        "wordcloud_b64": wc_b64,
+        "wordcloud_url": wc_url,
     }
 
-# ────── /api/query endpoint ────────────────────────────────
-@app.post("/api/query")
-async def api_query(req: QueryReq):
+@app.post("/api/summary")
+async def api_summary(req: SummaryReq):
+    vid = extract_video_id(req.url)
+    analyze = functools.partial(analyze_all, fast=req.fast)
+    return await _summarize(vid, get_video_info(vid), analyze)
+
+# ────── /api/batch-summary endpoint ─────────────────────────
+MAX_BATCH_URLS = 50
+
+def _video_id_or_error(url: str):
+    try:
+        return extract_video_id(url)
+    except HTTPException as e:
+        return e
+
+@app.post("/api/batch-summary")
+async def api_batch_summary(req: BatchSummaryReq):
+    if len(req.urls) > MAX_BATCH_URLS:
+        raise HTTPException(400, f"At most {MAX_BATCH_URLS} URLs per batch")
+    # one entry per URL, in request order (duplicates included); each video runs once
+    ids = [(u, _video_id_or_error(u)) for u in req.urls]
+    vids = list(dict.fromkeys(v for _, v in ids if isinstance(v, str)))
+
+    # one videos.list call covers every id; each video picks its entry out
+    metas = asyncio.create_task(get_videos_info(vids))
+
+    async def meta_of(vid: str) -> Dict[str, Any]:
+        return (await asyncio.shield(metas)).get(vid, {})
+
+    if req.fast:
+        analyze = analyze_all
+    else:
+        # one Batch API job for the whole request: wait until every video has
+        # either handed in its text or failed, then submit them together
+        loop = asyncio.get_running_loop()
+        texts = {v: loop.create_future() for v in vids}
+
+        async def submit():
+            done = await asyncio.gather(*texts.values(), return_exceptions=True)
+            return await openai_batch(
+                {v: _analysis_job(t) for v, t in zip(texts, done) if isinstance(t, str)}
+            )
+        batch = asyncio.ensure_future(submit())
+
+        async def analyze(vid: str, text: str):
+            job = _analysis_job(text)
+            raw = _cached_analysis(vid, job)
+            if raw is None:
+                texts[vid].set_result(text)
+                raw, finish_reason = _batch_reply(await asyncio.shield(batch), vid)
+                _store_analysis(vid, job, raw, finish_reason)
+            else:
+                texts[vid].cancel()          # cached: not part of the batch
+            return _parse_analysis(raw)
+
+    async def summarize(vid: str) -> Dict[str, Any]:
+        try:
+            return await _summarize(vid, meta_of(vid), analyze)
+        finally:
+            if not req.fast and not texts[vid].done():
+                texts[vid].cancel()          # failed before analysis: don't hold up the batch
+
+    results = dict(zip(vids, await asyncio.gather(
+        *(summarize(v) for v in vids), return_exceptions=True
+    )))
+    entries = []
+    for url, vid in ids:
+        r = vid if isinstance(vid, HTTPException) else results[vid]
+        if isinstance(r, BaseException):
+            r = {"videoId": vid if isinstance(vid, str) else None,
+                 "error": getattr(r, "detail", str(r))}
+        entries.append({"url": url, **r})      # own dict per entry, even for repeated URLs
+    return {"timestamp": datetime.utcnow().isoformat(), "results": entries}
+
+# ────── /api/wordcloud/{id}.png endpoint ────────────────────
+@app.get("/api/wordcloud/{video_id}.png")
+async def api_wordcloud(video_id: str):
+    png = cache.get(_wordcloud_key(video_id))
+    if png is None:
+        raise HTTPException(404, "Word cloud not found")
+    return Response(png, media_type="image/png", headers={
+        "Cache-Control": "public, max-age=86400",
+        "ETag": f'"{_png_version(png)}"',
+    })
+
+# ────── /api/summary/stream endpoint (SSE) ──────────────────
+def _sse(deltas) -> StreamingResponse:
+    """Relay text deltas as server-sent events, ending with [DONE]."""
+    async def events():
+        async for delta in deltas:
+            yield b"data: " + orjson.dumps(delta) + b"\n\n"
+        yield b"data: [DONE]\n\n"
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.post("/api/summary/stream")
+async def api_summary_stream(req: SummaryReq):
+    vid = extract_video_id(req.url)
+    transcript = await fetch_transcript(vid)
+    text = await asyncio.to_thread(truncate_tokens, transcript)
+    return _sse(openai_chat_stream(_SUMMARY_PROMPT + text))
+
+# ────── /api/query endpoints ───────────────────────────────
+async def _query_prompt(req: QueryReq) -> str:
     if not req.transcript.strip():
         raise HTTPException(400, "Transcript empty")
-
-    prompt = (
+    transcript = await asyncio.to_thread(truncate_tokens, req.transcript)
+    return (
         "You are a helpful assistant. Use ONLY the transcript below to answer the question.\n\n"
-        "Transcript:\n" + req.transcript[:4000] + "\n\nQ: " + req.query + "\nA:"
+        "Transcript:\n" + transcript + "\n\nQ: " + req.query + "\nA:"
     )
-    answer = await openai_chat(prompt)
+
+@app.post("/api/query")
+async def api_query(req: QueryReq):
+    answer = await openai_chat(await _query_prompt(req))
     return {"response": answer}
 
+@app.post("/api/query/stream")
+async def api_query_stream(req: QueryReq):
+    # same prompt + cache entry as /api/query, first tokens arrive immediately
+    return _sse(openai_chat_stream(await _query_prompt(req)))
 
+# ────── /api/cache endpoints ────────────────────────────────
+@app.get("/api/cache/stats")
+async def api_cache_stats():
+    return {"stats": dict(cache_stats), "entries": len(cache)}
 
+@app.delete("/api/cache/{video_id}")
+async def api_cache_invalidate(video_id: str):
+    """Drop cached metadata, transcript, analysis and word cloud for one video."""
+    keys = (
+        _video_info.cache_key(video_id),
+        fetch_transcript.cache_key(video_id),
+        _analysis_key(video_id),
+        _wordcloud_key(video_id),
+    )
+    return {"videoId": video_id, "deleted": sum(cache.delete(k) for k in keys)}
@@ -0,0 +1,26 @@
+"""Import orchestrator against a throwaway DATA_DIR, with an empty cache per test."""
+import os, shutil, sys, tempfile
+from pathlib import Path
+
+import pytest
+
+# before the first `import orchestrator`: the disk cache is opened at import time
+_DATA_DIR = tempfile.mkdtemp(prefix="videomind-tests-")
+os.environ["DATA_DIR"] = _DATA_DIR
+os.environ.setdefault("OPENAI_API_KEY", "test")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+@pytest.fixture
+def orch():
+    import orchestrator
+
+    orchestrator.cache.clear()
+    orchestrator.cache_stats.clear()
+    return orchestrator
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if "orchestrator" in sys.modules:
+        sys.modules["orchestrator"].cache.close()
+    shutil.rmtree(_DATA_DIR, ignore_errors=True)
@@ -0,0 +1,57 @@
+"""Per-video analysis cache: only complete, parseable replies are kept."""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+def _fake_complete(orch, monkeypatch, reply, finish_reason="stop"):
+    calls = []
+
+    async def complete(params):
+        calls.append(params)
+        return reply, finish_reason
+
+    monkeypatch.setattr(orch, "_complete", complete)
+    return calls
+
+
+GOOD = '{"summary": "s", "sentiment": {"overall": "positive", "score": 0.9, "explanation": "e"}}'
+
+
+def test_analysis_is_cached_per_video(orch, monkeypatch):
+    calls = _fake_complete(orch, monkeypatch, GOOD)
+
+    first = asyncio.run(orch.analyze_all("abcdefghijk", "text"))
+    second = asyncio.run(orch.analyze_all("abcdefghijk", "text"))
+    assert first == second and first[0] == "s"
+    assert len(calls) == 1
+
+    asyncio.run(orch.analyze_all("abcdefghijk", "other text"))    # new prompt → miss
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize("reply, finish_reason", [
+    ('{"summary": "cut off mid', "length"),
+    (GOOD, "length"),
+    ("not json", "stop"),
+    ("[1, 2]", "stop"),
+])
+def test_unusable_analysis_is_not_cached(orch, monkeypatch, reply, finish_reason):
+    calls = _fake_complete(orch, monkeypatch, reply, finish_reason)
+
+    asyncio.run(orch.analyze_all("abcdefghijk", "text"))
+    asyncio.run(orch.analyze_all("abcdefghijk", "text"))
+    assert len(calls) == 2
+    assert orch.cache.get(orch._analysis_key("abcdefghijk")) is None
+
+
+def test_invalidation_drops_the_analysis(orch, monkeypatch):
+    calls = _fake_complete(orch, monkeypatch, GOOD)
+    asyncio.run(orch.analyze_all("abcdefghijk", "text"))
+
+    res = TestClient(orch.app).delete("/api/cache/abcdefghijk")
+    assert res.json()["deleted"] == 1
+
+    asyncio.run(orch.analyze_all("abcdefghijk", "text"))
+    assert len(calls) == 2
@@ -0,0 +1,80 @@
+"""/api/batch-summary: one entry per URL, failures reported per URL."""
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+OK, NO_TRANSCRIPT, LLM_FAILS = "okvideo0001", "notranscrip", "llmfailure0"
+
+
+@pytest.fixture
+def api(orch, monkeypatch):
+    async def fetch_transcript(vid):
+        if vid == NO_TRANSCRIPT:
+            raise HTTPException(500, "Transcript unavailable")
+        return f"words about {vid}"
+
+    async def get_videos_info(ids):
+        return {v: {"title": f"Video {v}"} for v in ids}
+
+    async def analyze_all(vid, text, fast=True):
+        if vid == LLM_FAILS:
+            raise HTTPException(502, "OpenAI request failed: boom")
+        return f"summary of {vid}", {"overall": "neutral"}, {"themes": [], "keywords": []}
+
+    async def render_wordcloud(vid, freqs):
+        return None
+
+    monkeypatch.setattr(orch, "fetch_transcript", fetch_transcript)
+    monkeypatch.setattr(orch, "get_videos_info", get_videos_info)
+    monkeypatch.setattr(orch, "analyze_all", analyze_all)
+    monkeypatch.setattr(orch, "render_wordcloud", render_wordcloud)
+    monkeypatch.setattr(orch, "truncate_tokens", lambda text: text)
+    return TestClient(orch.app)
+
+
+def _url(vid):
+    return f"https://youtu.be/{vid}"
+
+
+def test_one_entry_per_url_in_order(api):
+    urls = [_url(OK), "not a url", _url(NO_TRANSCRIPT), _url(LLM_FAILS), _url(OK)]
+    results = api.post("/api/batch-summary", json={"urls": urls}).json()["results"]
+
+    assert len(results) == len(urls)
+    assert results[0]["summary"] == f"summary of {OK}"
+    assert results[0]["meta"] == {"title": f"Video {OK}"}
+    assert results[1] == {"url": "not a url", "videoId": None, "error": "Invalid YouTube URL"}
+    assert results[2]["videoId"] == NO_TRANSCRIPT
+    assert results[2]["transcript_error"] == "Transcript unavailable"
+    assert "summary" not in results[2]
+    assert results[3] == {"url": _url(LLM_FAILS), "videoId": LLM_FAILS,
+                          "error": "OpenAI request failed: boom"}
+    assert [r["url"] for r in results] == urls
+    assert results[4] == results[0]
+
+
+def test_batch_api_errors_are_per_url(api, orch, monkeypatch):
+    submitted = []
+
+    async def openai_batch(jobs):
+        submitted.append(sorted(jobs))
+        replies = {v: ('{"summary": "batched"}', "stop") for v in jobs if v != LLM_FAILS}
+        return replies, {v: "boom" for v in jobs if v not in replies}
+
+    monkeypatch.setattr(orch, "openai_batch", openai_batch)
+    urls = [_url(OK), _url(NO_TRANSCRIPT), _url(LLM_FAILS)]
+    results = api.post("/api/batch-summary", json={"urls": urls, "fast": False}).json()["results"]
+
+    assert submitted == [sorted([OK, LLM_FAILS])]         # one job, transcript failures left out
+    assert results[0]["summary"] == "batched"
+    assert results[1]["transcript_error"] == "Transcript unavailable"
+    assert results[2]["error"] == "OpenAI batch request failed: boom"
+
+
+@pytest.mark.parametrize("make_url", [
+    lambda i: _url(f"video{i:06d}"),
+    lambda i: _url(OK),                     # repeats count too
+])
+def test_too_many_urls(api, orch, make_url):
+    urls = [make_url(i) for i in range(orch.MAX_BATCH_URLS + 1)]
+    assert api.post("/api/batch-summary", json={"urls": urls}).status_code == 400
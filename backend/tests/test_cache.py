@@ -0,0 +1,47 @@
+"""disk_cached memoization: hits, misses, and empty results never stored."""
+import asyncio
+
+import pytest
+
+
+def test_disk_cached_hit_and_miss(orch):
+    calls = []
+
+    @orch.disk_cached("t")
+    def square(x, power=2):
+        calls.append(x)
+        return x ** power
+
+    assert square(3) == 9
+    assert square(3, power=2) == 9          # defaults are part of the key
+    assert square(3, 3) == 27
+    assert calls == [3, 3]
+    assert orch.cache_stats["t.hit"] == 1 and orch.cache_stats["t.miss"] == 2
+
+
+def test_disk_cached_async(orch):
+    calls = []
+
+    @orch.disk_cached("t")
+    async def echo(x):
+        calls.append(x)
+        return {"x": x}
+
+    assert asyncio.run(echo(1)) == {"x": 1}
+    assert asyncio.run(echo(1)) == {"x": 1}
+    assert calls == [1]
+
+
+@pytest.mark.parametrize("empty", ["", {}, [], None])
+def test_disk_cached_skips_empty_results(orch, empty):
+    calls = []
+
+    @orch.disk_cached("t")
+    def lookup(x):
+        calls.append(x)
+        return empty
+
+    lookup(1)
+    lookup(1)
+    assert calls == [1, 1]
+    assert orch.cache.get(lookup.cache_key(1)) is None
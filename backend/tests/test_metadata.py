@@ -0,0 +1,21 @@
+"""YouTube Data API calls: the API key stays out of URLs and logs."""
+import asyncio, logging
+
+import httpx
+
+
+def test_api_key_not_in_url_or_logs(orch, monkeypatch, caplog):
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(403, request=request)
+
+    monkeypatch.setattr(orch, "YOUTUBE_API_KEY", "SECRET")
+    monkeypatch.setattr(orch, "_httpx", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    with caplog.at_level(logging.WARNING, logger="orchestrator"):
+        assert asyncio.run(orch._video_items(["abcdefghijk"])) == []
+
+    assert seen[0].headers["X-Goog-Api-Key"] == "SECRET"
+    assert "SECRET" not in str(seen[0].url)
+    assert "403" in caplog.text and "SECRET" not in caplog.text
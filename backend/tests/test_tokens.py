@@ -0,0 +1,37 @@
+"""truncate_tokens: token budget, bounded encode, character fallback without tiktoken."""
+
+
+class FakeEncoding:
+    """One token per character."""
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, text):
+        self.encoded.append(text)
+        return list(text)
+
+    def decode(self, toks):
+        return "".join(toks)
+
+
+def test_cuts_to_budget(orch, monkeypatch):
+    enc = FakeEncoding()
+    monkeypatch.setattr(orch, "_encoding", lambda: enc)
+    assert orch.truncate_tokens("abcdef", 4) == "abcd"
+    assert orch.truncate_tokens("abc", 4) == "abc"
+
+
+def test_encodes_a_bounded_prefix(orch, monkeypatch):
+    enc = FakeEncoding()
+    monkeypatch.setattr(orch, "_encoding", lambda: enc)
+    orch.truncate_tokens("x" * 1000, 10)
+    assert len(enc.encoded[0]) == 80
+
+
+def test_falls_back_to_characters(orch, monkeypatch):
+    def offline():
+        raise ConnectionError("no network")
+
+    monkeypatch.setattr(orch, "_encoding", offline)
+    assert orch.truncate_tokens("x" * 1000, 10) == "x" * 40
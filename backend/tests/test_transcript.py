@@ -0,0 +1,56 @@
+"""Concurrent transcript probing: first usable candidate wins, fallbacks after."""
+import asyncio, time
+
+import pytest
+from fastapi import HTTPException
+
+
+class FakeTrack:
+    def __init__(self, text="", delay=0.0, error=None):
+        self.text, self.delay, self.error = text, delay, error
+        self.fetched = False
+
+    def fetch(self):
+        self.fetched = True
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return [{"text": self.text}]
+
+
+def test_fastest_candidate_wins(orch):
+    slow, fast = FakeTrack("slow", delay=0.3), FakeTrack("fast")
+    assert asyncio.run(orch._first_transcript([slow, fast])) == "fast"
+
+
+def test_failed_and_empty_candidates_are_skipped(orch):
+    tracks = [FakeTrack(error=RuntimeError("no")), FakeTrack(""), FakeTrack("ok", delay=0.05)]
+    assert asyncio.run(orch._first_transcript(tracks)) == "ok"
+
+
+def test_only_top_candidates_are_probed(orch, monkeypatch):
+    monkeypatch.setattr(orch, "TRANSCRIPT_PROBES", 1)
+    first, second = FakeTrack(error=RuntimeError("no")), FakeTrack("second")
+    assert asyncio.run(orch._first_transcript([first, second])) == ""
+    assert not second.fetched
+
+
+def test_fetch_transcript_falls_back(orch, monkeypatch):
+    english, fallback = FakeTrack(""), FakeTrack("translated")
+    monkeypatch.setattr(orch, "_transcript_candidates", lambda vid: ([english], [fallback]))
+    assert asyncio.run(orch.fetch_transcript("abcdefghijk")) == "translated"
+
+
+def test_fetch_transcript_skips_fallbacks_when_english_works(orch, monkeypatch):
+    english, fallback = FakeTrack("english"), FakeTrack("translated")
+    monkeypatch.setattr(orch, "_transcript_candidates", lambda vid: ([english], [fallback]))
+    assert asyncio.run(orch.fetch_transcript("abcdefghijk")) == "english"
+    assert not fallback.fetched
+
+
+def test_fetch_transcript_unavailable_is_not_cached(orch, monkeypatch):
+    monkeypatch.setattr(orch, "_transcript_candidates", lambda vid: ([FakeTrack("")], []))
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(orch.fetch_transcript("abcdefghijk"))
+    assert exc.value.status_code == 500
+    assert orch.cache.get(orch.fetch_transcript.cache_key("abcdefghijk")) is None
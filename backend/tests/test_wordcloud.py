@@ -0,0 +1,72 @@
+"""Word-cloud URLs carry the PNG's content hash, which the endpoint sends as its ETag."""
+import asyncio
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from openai import AsyncOpenAI
+
+VID = "abcdefghijk"
+
+
+@pytest.fixture
+def render(orch, monkeypatch):
+    # a thread stands in for the worker process: no fork, no matplotlib
+    pool = ThreadPoolExecutor(1)
+    renders = []
+
+    def make_wordcloud(freqs):
+        renders.append(freqs)
+        return b"\x89PNG " + repr(sorted(freqs.items())).encode()
+
+    monkeypatch.setattr(orch, "_WC_POOL", pool)
+    monkeypatch.setattr(orch, "make_wordcloud", make_wordcloud)
+    yield lambda freqs: asyncio.run(orch.render_wordcloud(VID, freqs)), renders
+    pool.shutdown()
+
+
+def test_version_round_trip(orch, render):
+    render_wordcloud, renders = render
+    api = TestClient(orch.app)
+
+    url = render_wordcloud(Counter(alpha=2))
+    path, version = url.split("?v=")
+    assert path == f"/api/wordcloud/{VID}.png"
+    res = api.get(url)
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "image/png"
+    assert res.headers["etag"] == f'"{version}"'
+    assert res.content.startswith(b"\x89PNG")
+
+    assert render_wordcloud(Counter(alpha=2)) == url        # cached: same URL, no re-render
+    assert len(renders) == 1
+
+    api.delete(f"/api/cache/{VID}")
+    new_url = render_wordcloud(Counter(beta=3))
+    assert new_url != url
+    assert api.get(new_url).headers["etag"] == f'"{new_url.split("?v=")[1]}"'
+
+
+def test_no_words_no_image(orch, render):
+    render_wordcloud, renders = render
+    assert render_wordcloud(Counter()) is None
+    assert not renders
+    assert TestClient(orch.app).get(f"/api/wordcloud/{VID}.png").status_code == 404
+
+
+def test_startup_logs_worker_failures(orch, monkeypatch, caplog):
+    def broken_worker():
+        raise ImportError("No module named 'wordcloud'")
+
+    monkeypatch.setattr(orch, "_WC_POOL", ThreadPoolExecutor(1))
+    monkeypatch.setattr(orch, "WC_WORKERS", 1)
+    monkeypatch.setattr(orch, "_warm_wordcloud_worker", broken_worker)
+    monkeypatch.setattr(orch, "_encoding", lambda: None)
+    monkeypatch.setattr(orch, "_httpx", httpx.AsyncClient())
+    monkeypatch.setattr(orch, "client", AsyncOpenAI(api_key="test"))
+    with TestClient(orch.app):
+        pass
+    assert "word-cloud worker failed to start" in caplog.text
+    assert "No module named 'wordcloud'" in caplog.text
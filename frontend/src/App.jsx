@@ -37,7 +37,11 @@ const App = () => {
         url: inputUrl,
         agent: agents[activeAgent],
       });
-      setResponseText(res.data.summary || "");
+      // no transcript → 200 with metadata only and a transcript_error
+      setResponseText(
+        res.data.summary ||
+          (res.data.transcript_error ? `⚠️ ${res.data.transcript_error}` : "")
+      );
       setTranscript(res.data.transcript || ""); // 🆕 store transcript
     } catch (err) {
       console.error("Error fetching summary:", err);